@@ -7,69 +7,116 @@ A simplified demo of the Stock Analysis AI Crew that showcases the agent interac
 without requiring complex external dependencies. This is perfect for learning CrewAI!
 """
 
+from __future__ import annotations
+
 import os
 from datetime import datetime
-from crewai import Agent, Task, Crew, Process
-from langchain_community.llms import Ollama
-
-# Initialize Ollama with DeepSeek-R1 model
-try:
-    llm = Ollama(
-        model="deepseek-r1:8b",
-        base_url="http://localhost:11434",
-        temperature=0.1
-    )
-    print("✅ Connected to Ollama with DeepSeek-R1:8b")
-except Exception as e:
-    print(f"⚠️  Ollama connection failed: {e}")
-    print("Make sure Ollama is running and DeepSeek-R1:8b is installed")
-    exit(1)
+from typing import TYPE_CHECKING
+
+# crewai and langchain take a long time to import, so they are only loaded
+# once an analysis actually runs
+if TYPE_CHECKING:
+    from crewai import Agent, Task
+
+llm = None
+
+# Agent/crew output is off by default: printing every intermediate token of
+# DeepSeek-R1's reasoning slows the run down. Set CREW_VERBOSE=1 or 2 to see it.
+VERBOSE = int(os.environ.get("CREW_VERBOSE", "0"))
+
+# Embed memories with the local Ollama runtime instead of downloading a
+# sentence-transformers model on first use
+EMBEDDER = {"provider": "ollama", "config": {"model": "nomic-embed-text"}}
+
+# Shared across run_stock_analysis calls so the embedder and vector store
+# are only set up once per process
+_SHARED_MEMORY = None
+
+
+def get_llm():
+    """Initialize Ollama with DeepSeek-R1 model on first use"""
+    global llm
+    if llm is None:
+        from langchain_community.llms import Ollama
+
+        try:
+            llm = Ollama(
+                model=os.environ.get("OLLAMA_MODEL", "deepseek-r1:8b"),
+                base_url="http://localhost:11434",
+                temperature=0.1,
+                num_ctx=4096,
+                stop=["\n\n\n"]
+            )
+            print("✅ Connected to Ollama with DeepSeek-R1:8b")
+        except Exception as e:
+            print(f"⚠️  Ollama connection failed: {e}")
+            print("Make sure Ollama is running and DeepSeek-R1:8b is installed")
+            exit(1)
+    return llm
+
+
+def get_shared_memory():
+    """Create the crew's short-term memory store on first use"""
+    global _SHARED_MEMORY
+    if _SHARED_MEMORY is None:
+        from crewai.memory import ShortTermMemory
+
+        _SHARED_MEMORY = ShortTermMemory(embedder_config=EMBEDDER)
+    return _SHARED_MEMORY
 
 
 def create_market_analyst() -> Agent:
     """Creates a Market Research Analyst agent"""
+    from crewai import Agent
+
     return Agent(
         role="Senior Market Research Analyst",
         goal="Research and analyze market conditions for {stock_symbol}",
         backstory="""You are an experienced market research analyst with deep knowledge 
         of financial markets, industry trends, and economic indicators. You excel at 
         gathering market intelligence and identifying key factors that drive stock performance.""",
-        verbose=True,
+        verbose=bool(VERBOSE),
         allow_delegation=False,
-        llm=llm
+        llm=get_llm()
     )
 
 
 def create_financial_analyst() -> Agent:
     """Creates a Financial Analyst agent"""
+    from crewai import Agent
+
     return Agent(
         role="Senior Financial Analyst",
         goal="Analyze financial health and performance metrics for {stock_symbol}",
         backstory="""You are a CFA charterholder with expertise in financial statement 
         analysis, ratio calculations, and valuation methods. You can quickly assess a 
         company's financial strength and identify potential red flags.""",
-        verbose=True,
+        verbose=bool(VERBOSE),
         allow_delegation=False,
-        llm=llm
+        llm=get_llm()
     )
 
 
 def create_investment_advisor() -> Agent:
     """Creates an Investment Advisor agent"""
+    from crewai import Agent
+
     return Agent(
         role="Senior Investment Advisor",
         goal="Provide actionable investment recommendations for {stock_symbol}",
         backstory="""You are a seasoned investment advisor with 20+ years of experience. 
         You excel at synthesizing complex analysis into clear, actionable investment 
         recommendations that consider risk, return, and market conditions.""",
-        verbose=True,
+        verbose=bool(VERBOSE),
         allow_delegation=True,
-        llm=llm
+        llm=get_llm()
     )
 
 
 def create_market_research_task(agent: Agent) -> Task:
     """Creates market research task"""
+    from crewai import Task
+
     return Task(
         description="""Conduct comprehensive market research for {stock_symbol}:
         
@@ -95,6 +142,8 @@ def create_market_research_task(agent: Agent) -> Task:
 
 def create_financial_analysis_task(agent: Agent) -> Task:
     """Creates financial analysis task"""
+    from crewai import Task
+
     return Task(
         description="""Perform financial analysis for {stock_symbol}:
         
@@ -120,6 +169,8 @@ def create_financial_analysis_task(agent: Agent) -> Task:
 
 def create_investment_recommendation_task(agent: Agent) -> Task:
     """Creates final investment recommendation task"""
+    from crewai import Task
+
     return Task(
         description="""Synthesize the market research and financial analysis to provide 
         a comprehensive investment recommendation for {stock_symbol}:
@@ -147,6 +198,7 @@ def create_investment_recommendation_task(agent: Agent) -> Task:
 
 def run_stock_analysis(stock_symbol: str):
     """Run the stock analysis crew"""
+    from crewai import Crew, Process
 
     print(f"\n🚀 Starting Stock Analysis for {stock_symbol.upper()}")
     print("=" * 60)
@@ -162,14 +214,21 @@ def run_stock_analysis(stock_symbol: str):
     investment_recommendation_task = create_investment_recommendation_task(
         investment_advisor)
 
+    # Reuse the memory store (and its loaded embedder) but start empty, so
+    # findings for an earlier symbol can't surface in this report
+    memory = get_shared_memory()
+    memory.reset()
+
     # Create crew
     crew = Crew(
         agents=[market_analyst, financial_analyst, investment_advisor],
         tasks=[market_research_task, financial_analysis_task,
                investment_recommendation_task],
         process=Process.sequential,
-        verbose=2,
-        memory=True
+        verbose=VERBOSE,
+        memory=True,
+        embedder=EMBEDDER,
+        short_term_memory=memory
     )
 
     # Run analysis
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+LLM Response Cache
+==================
+
+A small disk-backed cache for Ollama responses. Re-analyzing the same stock
+with the same prompts returns the stored answer instead of re-running the model.
+Responses are keyed by a hash of the model, prompt (or chat messages) and
+generation options.
+"""
+
+import hashlib
+import json
+from typing import Dict, Any, Optional
+
+import diskcache
+
+CACHE_DIR = "./.llm_cache"
+CACHE_TTL = 86400  # 24 hours
+
+# Low temperatures are close enough to deterministic to reuse responses
+MAX_CACHEABLE_TEMPERATURE = 0.1
+
+
+def make_key(model: str, prompt: Any, options: Dict[str, Any]) -> str:
+    """Build a cache key from the model, prompt and options"""
+    raw = json.dumps(
+        {"model": model, "prompt": prompt, "options": options}, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """Disk-backed cache of LLM responses"""
+
+    def __init__(self, directory: str = CACHE_DIR, ttl: int = CACHE_TTL):
+        self.cache = diskcache.Cache(directory)
+        self.ttl = ttl
+        self.stats = {"hits": 0, "misses": 0}
+
+    def is_cacheable(self, options: Dict[str, Any]) -> bool:
+        """Only cache (near) deterministic generations"""
+        return options.get("temperature", 0) <= MAX_CACHEABLE_TEMPERATURE
+
+    def get(self, model: str, prompt: Any, options: Dict[str, Any]) -> Optional[str]:
+        """Return the cached response, or None on a miss"""
+        if not self.is_cacheable(options):
+            return None
+        response = self.cache.get(make_key(model, prompt, options))
+        self.stats["hits" if response is not None else "misses"] += 1
+        return response
+
+    def set(self, model: str, prompt: Any, options: Dict[str, Any], response: str):
+        """Store a response"""
+        if self.is_cacheable(options):
+            self.cache.set(make_key(model, prompt, options),
+                           response, expire=self.ttl)
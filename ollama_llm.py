@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Ollama LLM
+==========
+
+A LangChain LLM backed by the Ollama Python SDK. Each instance keeps one
+ollama.Client, so its requests reuse the same HTTP connection pool. CrewAI
+calls the LLM synchronously; tasks with async_execution=True run in their own
+threads, so their requests still reach Ollama concurrently.
+With streaming=True tokens are passed to the callbacks as they are generated.
+Pass an LLMCache as response_cache to reuse responses to repeated prompts.
+"""
+
+from typing import Any, Dict, Iterator, List, Optional
+
+import ollama
+from langchain_core.callbacks.manager import CallbackManagerForLLMRun
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import GenerationChunk
+from langchain_core.pydantic_v1 import PrivateAttr
+
+
+class OllamaLLM(LLM):
+    """Ollama LLM with streaming and an optional response cache"""
+
+    model: str = "deepseek-r1:8b"
+    base_url: str = "http://localhost:11434"
+    temperature: float = 0.1
+    num_ctx: Optional[int] = None
+    streaming: bool = False
+    response_cache: Optional[Any] = None  # LLMCache
+
+    _client: ollama.Client = PrivateAttr()
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        # Shared by every call (and thread) using this LLM
+        self._client = ollama.Client(host=self.base_url)
+
+    @property
+    def _llm_type(self) -> str:
+        return "ollama-sdk"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "base_url": self.base_url,
+            "temperature": self.temperature,
+            "num_ctx": self.num_ctx
+        }
+
+    def _options(self, stop: Optional[List[str]]) -> Dict[str, Any]:
+        """Generation options for a request"""
+        options = {"temperature": self.temperature}
+        if self.num_ctx:
+            options["num_ctx"] = self.num_ctx
+        if stop:
+            options["stop"] = stop
+        return options
+
+    def _cached(self, prompt: str, stop: Optional[List[str]]) -> Optional[str]:
+        """Return the cached response to a prompt, or None on a miss"""
+        if self.response_cache is None:
+            return None
+        return self.response_cache.get(self.model, prompt, self._options(stop))
+
+    def _store(self, prompt: str, stop: Optional[List[str]], response: str):
+        """Cache the response to a prompt"""
+        if self.response_cache is not None:
+            self.response_cache.set(
+                self.model, prompt, self._options(stop), response)
+
+    def _call(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> str:
+        """Generate a response, blocking until it is complete"""
+        cached = self._cached(prompt, stop)
+        if cached is not None:
+            if self.streaming and run_manager:
+                run_manager.on_llm_new_token(cached)
+            return cached
+
+        if self.streaming:
+            text = "".join(chunk.text for chunk in self._stream(
+                prompt, stop, run_manager, **kwargs))
+        else:
+            text = self._client.generate(
+                model=self.model,
+                prompt=prompt,
+                options=self._options(stop),
+                stream=False
+            )["response"]
+
+        self._store(prompt, stop, text)
+        return text
+
+    def _stream(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[GenerationChunk]:
+        """Yield the response token by token"""
+        stream = self._client.generate(
+            model=self.model,
+            prompt=prompt,
+            options=self._options(stop),
+            stream=True
+        )
+        for part in stream:
+            chunk = GenerationChunk(text=part["response"])
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
@@ -4,18 +4,22 @@ import ollama
 
 def generate_response(prompt):
     try:
-        # Generate response from Ollama
-        response = ollama.chat(model='codellama:7b', messages=[
+        # Stream the response from Ollama chunk by chunk
+        stream = ollama.chat(model='codellama:7b', messages=[
             {
                 'role': 'user',
                 'content': prompt
             }
-        ])
-        return response['message']['content']
+        ], stream=True)
+        for chunk in stream:
+            yield chunk['message']['content']
     except Exception as e:
-        return f"An error occurred: {str(e)}"
+        yield f"An error occurred: {str(e)}"
 
 
+# Only the most recent messages are redrawn on every rerun
+HISTORY_WINDOW = 20
+
 # Streamlit UI
 st.title("CodeLlama Chat Interface")
 st.write("Chat with CodeLlama 7B using Ollama")
@@ -24,8 +28,14 @@ st.write("Chat with CodeLlama 7B using Ollama")
 if 'messages' not in st.session_state:
     st.session_state.messages = []
 
-# Display chat history
-for message in st.session_state.messages:
+# Display chat history. Streamlit reruns the whole script on every message,
+# so older messages are only rendered on request to keep each turn cheap.
+messages = st.session_state.messages
+earlier = max(len(messages) - HISTORY_WINDOW, 0)
+if earlier and st.toggle(f"Show {earlier} earlier messages"):
+    earlier = 0
+
+for message in messages[earlier:]:
     with st.chat_message(message["role"]):
         st.markdown(message["content"])
 
@@ -40,8 +50,7 @@ if prompt := st.chat_input("What would you like to ask?"):
 
     # Generate and display assistant response
     with st.chat_message("assistant"):
-        response = generate_response(prompt)
-        st.markdown(response)
+        response = st.write_stream(generate_response(prompt))
 
     # Add assistant response to chat history
     st.session_state.messages.append(
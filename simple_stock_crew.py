@@ -10,94 +10,435 @@ This version uses basic classes to simulate agent behavior and shows how
 multiple AI agents can work together to analyze stocks.
 """
 
+import asyncio
 import json
+import logging
+import os
+import re
+import string
+import threading
+import time
+import httpx
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime
-from typing import Dict, List, Any, Optional
-import yfinance as yf
+from typing import Dict, List, Any, Optional, AsyncIterator, NamedTuple
+
+from llm_cache import LLMCache
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:  # optional, falls back to the standard json module
+    orjson = None
+
+OLLAMA_URL = "http://localhost:11434/api/chat"
+# Set OLLAMA_MODEL to a lower-bit quantization of the model for faster generation
+OLLAMA_MODEL = os.environ.get("OLLAMA_MODEL", "deepseek-r1:8b")
+# How long Ollama keeps the model (and its KV cache) loaded between calls
+OLLAMA_KEEP_ALIVE = "30m"
+
+# How long fetched stock data is reused before hitting Yahoo again (seconds)
+STOCK_DATA_TTL = 300
+
+# Number of requests Ollama serves at once (match the server's OLLAMA_NUM_PARALLEL)
+OLLAMA_NUM_PARALLEL = int(os.environ.get("OLLAMA_NUM_PARALLEL", "4"))
+
+# Generation options shared by every request. num_ctx must be the same on all
+# calls, otherwise Ollama reloads the model; 4096 fits the advisor's history.
+OLLAMA_OPTIONS = {
+    "temperature": 0.1,
+    "num_ctx": 4096,
+    "num_batch": 512,
+    "stop": ["\n\n\n"]
+}
+
+
+def create_session() -> requests.Session:
+    """Create a pooled HTTP session with retry/backoff for Ollama calls"""
+    retry = Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET", "POST"]
+    )
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=8, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+# Used for the crew's setup requests (health check, warm-up, context priming)
+_SESSION = create_session()
+
+
+def create_async_client() -> httpx.AsyncClient:
+    """Create a pooled async HTTP client with connection retries for agent calls
+
+    The client is tied to the event loop it is used in, so the crew opens one
+    per run and shares it across all agents.
+    """
+    transport = httpx.AsyncHTTPTransport(
+        retries=3,
+        limits=httpx.Limits(max_connections=8, max_keepalive_connections=8)
+    )
+    return httpx.AsyncClient(transport=transport, timeout=120)
+
+
+# Prompt templates, compiled once at import. Static text comes first and the
+# per-call values last so the leading part of each prompt stays identical.
+CONTEXT_TEMPLATE = string.Template("""
+Stock: $symbol - $company_name
+Current Price: $$$current_price
+Market Cap: $$$market_cap
+P/E Ratio: $pe_ratio
+Sector: $sector
+Industry: $industry
+Beta: $beta
+Dividend Yield: $dividend_yield
+52-Week Range: $$$week_52_low - $$$week_52_high
+Year Performance: $year_performance
+""")
+
+CONTEXT_PREFIX_TEMPLATE = string.Template("""
+Context: $context
+""")
+
+AGENT_TEMPLATE = string.Template("""
+Role: $role
+Goal: $goal
+Background: $backstory
+
+Task: $prompt
+
+Please provide a detailed analysis based on your role and expertise.
+""")
+
+MARKET_TEMPLATE = string.Template("""
+Analyze the market conditions for $symbol:
+
+1. Industry Analysis: What trends are affecting the $sector sector?
+2. Competitive Position: How does this company compare in the $industry industry?
+3. Market Catalysts: What factors could drive the stock price?
+4. Economic Impact: How might macroeconomic factors affect this stock?
+
+Provide specific insights about market dynamics and competitive positioning.
+""")
+
+FINANCIAL_TEMPLATE = string.Template("""
+Analyze the financial aspects of $symbol:
+
+1. Valuation Assessment: Is the P/E ratio of $pe_ratio reasonable for this company?
+2. Financial Health: What does the current market cap of $$$market_cap suggest?
+3. Dividend Analysis: Evaluate the dividend yield of $dividend_yield
+4. Growth Potential: Based on the sector and industry, what growth prospects exist?
+
+Focus on financial metrics and valuation analysis.
+""")
+
+RISK_TEMPLATE = string.Template("""
+Assess the investment risks for $symbol:
+
+1. Market Risk: The beta is $beta - what does this mean for volatility?
+2. Sector Risk: What risks are specific to the $sector sector?
+3. Valuation Risk: Is the current valuation sustainable?
+4. Scenario Analysis: What are the best and worst case scenarios?
+
+Provide a comprehensive risk assessment with specific risk factors.
+""")
+
+RECOMMENDATION_TEMPLATE = string.Template("""
+Based on the market, financial and risk analyses above, provide a final investment recommendation for $symbol.
+
+Provide:
+1. Investment Recommendation: BUY/HOLD/SELL with conviction level (1-10)
+2. Price Target: 12-month target price with reasoning
+3. Key Risks: Top 3 risks to monitor
+4. Investment Thesis: Why invest or not invest
+5. Position Sizing: Recommended allocation percentage
+
+Make it actionable and specific.
+""")
+
+
+# DeepSeek-R1 reasoning block, removed from responses if the server still sends it
+THINK_PATTERN = re.compile(r"<think>.*?(?:</think>|$)", re.DOTALL)
+
+
+def strip_reasoning(text: str) -> str:
+    """Remove the <think>...</think> reasoning trace from a response"""
+    return THINK_PATTERN.sub("", text).strip()
+
+
+def context_prompt(context: str) -> str:
+    """Static stock data portion of every agent prompt (the cacheable prefix)"""
+    return CONTEXT_PREFIX_TEMPLATE.substitute(context=context)
 
 
 class OllamaAgent:
     """Simple agent that uses Ollama for reasoning"""
 
-    def __init__(self, role: str, goal: str, backstory: str):
+    def __init__(self, role: str, goal: str, backstory: str,
+                 cache: Optional[LLMCache] = None, max_tokens: int = 1000):
         self.role = role
         self.goal = goal
         self.backstory = backstory
-        self.ollama_url = "http://localhost:11434/api/generate"
-
-    def think(self, prompt: str, context: str = "") -> str:
-        """Use Ollama to process the prompt and return response"""
-        try:
-            full_prompt = f"""
-Role: {self.role}
-Goal: {self.goal}
-Background: {self.backstory}
-
-Context: {context}
+        self.ollama_url = OLLAMA_URL
+        self.cache = cache
+        self.max_tokens = max_tokens
+        # Shared pooled client, set by the crew for the duration of a run
+        self.client: Optional[httpx.AsyncClient] = None
+        # Fill in the fixed agent fields once, only $prompt varies per call.
+        # "$" is escaped so the fields survive the second substitution.
+        self.prompt_template = string.Template(AGENT_TEMPLATE.safe_substitute(
+            role=role.replace("$", "$$"),
+            goal=goal.replace("$", "$$"),
+            backstory=backstory.replace("$", "$$")))
+
+    def agent_prompt(self, prompt: str) -> str:
+        """Agent specific portion of the prompt (follows the context prefix)"""
+        return self.prompt_template.substitute(prompt=prompt)
+
+    def build_messages(self, prompt: str, context: str = "",
+                       history: Optional[List[Dict[str, str]]] = None) -> List[Dict[str, str]]:
+        """Build the chat messages for a prompt
+
+        The stock data context is always the first (system) message, followed
+        by any earlier conversation and then this agent's task. Requests that
+        share a leading run of messages let Ollama reuse the KV cache for it.
+        """
+        messages = [{"role": "system", "content": context_prompt(context)}]
+        messages.extend(history or [])
+        messages.append({"role": "user", "content": self.agent_prompt(prompt)})
+        return messages
+
+    def build_payload(self, messages: List[Dict[str, str]]) -> Dict[str, Any]:
+        """Build the Ollama chat payload for a list of messages"""
+        return {
+            "model": OLLAMA_MODEL,
+            "messages": messages,
+            "stream": True,
+            "keep_alive": OLLAMA_KEEP_ALIVE,
+            # The reasoning trace isn't used, so don't spend tokens generating it
+            "think": False,
+            "options": {
+                **OLLAMA_OPTIONS,
+                "num_predict": self.max_tokens
+            }
+        }
 
-Task: {prompt}
+    def cached_response(self, payload: Dict[str, Any]) -> Optional[str]:
+        """Look up a previous response for the same messages"""
+        if self.cache is None:
+            return None
+
+        cached = self.cache.get(
+            payload["model"], payload["messages"], payload["options"])
+        if cached is not None:
+            logger.info(f"⚡ Cache hit for {self.role}")
+        return cached
+
+    def cache_response(self, payload: Dict[str, Any], response: str):
+        """Store a response for later identical messages"""
+        if self.cache is not None:
+            self.cache.set(payload["model"], payload["messages"],
+                           payload["options"], response)
+
+    async def astream_think(self, prompt: str, context: str = "",
+                            history: Optional[List[Dict[str, str]]] = None) -> AsyncIterator[str]:
+        """Stream the response from Ollama as chunks of text arrive"""
+        payload = self.build_payload(
+            self.build_messages(prompt, context, history))
+
+        cached = self.cached_response(payload)
+        if cached is not None:
+            yield cached
+            return
 
-Please provide a detailed analysis based on your role and expertise.
-"""
+        # Outside a crew run there is no shared client, so use a temporary one
+        owns_client = self.client is None
+        client = create_async_client() if owns_client else self.client
 
-            payload = {
-                "model": "deepseek-r1:8b",
-                "prompt": full_prompt,
-                "stream": False,
-                "options": {
-                    "temperature": 0.1,
-                    "num_predict": 1000
-                }
-            }
+        chunks = []
+        try:
+            async with client.stream("POST", self.ollama_url, json=payload) as response:
+                if response.status_code != 200:
+                    body = await response.aread()
+                    yield f"Error: {response.status_code} - {body.decode()}"
+                    return
+
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    message = json.loads(line).get("message", {})
+                    text = message.get("content", "")
+                    if text:
+                        chunks.append(text)
+                        yield text
 
-            response = requests.post(
-                self.ollama_url, json=payload, timeout=120)
+        except Exception as e:
+            yield f"Error communicating with Ollama: {str(e)}"
+            return
+        finally:
+            if owns_client:
+                await client.aclose()
 
-            if response.status_code == 200:
-                result = response.json()
-                return result.get("response", "No response generated")
-            else:
-                return f"Error: {response.status_code} - {response.text}"
+        if not chunks:
+            yield "No response generated"
+            return
 
-        except Exception as e:
-            return f"Error communicating with Ollama: {str(e)}"
+        self.cache_response(payload, strip_reasoning("".join(chunks)))
+
+    async def athink(self, prompt: str, context: str = "",
+                     history: Optional[List[Dict[str, str]]] = None) -> str:
+        """Return the full response, so independent agents can run concurrently"""
+        chunks = [chunk async for chunk in self.astream_think(
+            prompt, context, history)]
+        return strip_reasoning("".join(chunks)) or "No response generated"
+
+
+class StockInfo(NamedTuple):
+    """Stock data flattened for prompt building (field names match the templates)"""
+    symbol: str
+    company_name: str
+    current_price: float
+    market_cap: int
+    pe_ratio: float
+    sector: str
+    industry: str
+    beta: float
+    dividend_yield: float
+    week_52_high: float
+    week_52_low: float
+    year_performance: str
+
+    @classmethod
+    def from_data(cls, stock_data: Dict[str, Any]) -> "StockInfo":
+        """Build from the dict returned by StockDataFetcher.get_stock_info"""
+        return cls(
+            symbol=stock_data["symbol"],
+            company_name=stock_data["company_name"],
+            current_price=stock_data["current_price"],
+            market_cap=stock_data["market_cap"],
+            pe_ratio=stock_data["pe_ratio"],
+            sector=stock_data["sector"],
+            industry=stock_data["industry"],
+            beta=stock_data["beta"],
+            dividend_yield=stock_data["dividend_yield"],
+            week_52_high=stock_data["52_week_high"],
+            week_52_low=stock_data["52_week_low"],
+            year_performance=stock_data["year_performance"]
+        )
 
 
 class StockDataFetcher:
     """Fetches real stock data"""
 
-    def get_stock_info(self, symbol: str) -> Dict[str, Any]:
-        """Get basic stock information"""
+    def __init__(self, ttl: int = STOCK_DATA_TTL):
+        self.ttl = ttl
+        # symbol -> (fetch time, stock info)
+        self._cache: Dict[str, tuple] = {}
+
+    def cached_stock_info(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Return stock info fetched within the last ttl seconds, if any"""
+        entry = self._cache.get(symbol)
+        if entry is not None and time.monotonic() - entry[0] < self.ttl:
+            return entry[1]
+        return None
+
+    def get_stock_info(self, symbol: str, close=None) -> Dict[str, Any]:
+        """Get basic stock information, reusing recent results"""
+        cached = self.cached_stock_info(symbol)
+        if cached is not None:
+            return cached
+
+        stock_info = self.fetch_stock_info(symbol, close)
+        if "error" not in stock_info:
+            self._cache[symbol] = (time.monotonic(), stock_info)
+        return stock_info
+
+    def fetch_stock_info(self, symbol: str, close=None) -> Dict[str, Any]:
+        """Fetch basic stock information from Yahoo Finance
+
+        close is an already fetched 1y daily close series; when omitted the
+        price history is fetched alongside the ticker info.
+        """
+        # Imported here, yfinance (and pandas) are slow to import
+        import yfinance as yf
+
         try:
             stock = yf.Ticker(symbol)
-            info = stock.info
-            hist = stock.history(period="1y")
 
+            if close is None:
+                # .info and .history are separate HTTP calls, fetch them concurrently
+                with ThreadPoolExecutor(max_workers=2) as executor:
+                    info_future = executor.submit(lambda: stock.info)
+                    # Only the first and last close are used
+                    hist_future = executor.submit(
+                        stock.history, period="1y", interval="1d", actions=False)
+                    info = info_future.result()
+                    close = hist_future.result()["Close"]
+            else:
+                info = stock.info
+
+            get = info.get
             return {
                 "symbol": symbol,
-                "company_name": info.get("longName", "N/A"),
-                "current_price": info.get("currentPrice", 0),
-                "market_cap": info.get("marketCap", 0),
-                "pe_ratio": info.get("trailingPE", 0),
-                "sector": info.get("sector", "N/A"),
-                "industry": info.get("industry", "N/A"),
-                "beta": info.get("beta", 0),
-                "dividend_yield": info.get("dividendYield", 0),
-                "52_week_high": info.get("fiftyTwoWeekHigh", 0),
-                "52_week_low": info.get("fiftyTwoWeekLow", 0),
-                "year_performance": f"{((hist['Close'].iloc[-1] / hist['Close'].iloc[0] - 1) * 100):.2f}%" if not hist.empty else "N/A"
+                "company_name": get("longName", "N/A"),
+                "current_price": get("currentPrice", 0),
+                "market_cap": get("marketCap", 0),
+                "pe_ratio": get("trailingPE", 0),
+                "sector": get("sector", "N/A"),
+                "industry": get("industry", "N/A"),
+                "beta": get("beta", 0),
+                "dividend_yield": get("dividendYield", 0),
+                "52_week_high": get("fiftyTwoWeekHigh", 0),
+                "52_week_low": get("fiftyTwoWeekLow", 0),
+                "year_performance": f"{((close.iat[-1] / close.iat[0] - 1) * 100):.2f}%" if not close.empty else "N/A"
             }
         except Exception as e:
             return {"error": f"Failed to fetch data: {str(e)}"}
 
+    def get_stock_info_batch(self, symbols: List[str], max_workers: int = 8) -> Dict[str, Dict[str, Any]]:
+        """Get basic stock information for several symbols concurrently"""
+        import yfinance as yf
+
+        series = {symbol: None for symbol in symbols}
+        missing = [symbol for symbol in symbols
+                   if self.cached_stock_info(symbol) is None]
+
+        # One request for every uncached symbol's price history
+        if missing:
+            try:
+                closes = yf.download(" ".join(missing), period="1y", interval="1d",
+                                     actions=False, progress=False)["Close"]
+                for symbol in missing:
+                    series[symbol] = closes[symbol].dropna()
+            except Exception:
+                # Fall back to fetching the history per symbol
+                pass
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(
+                lambda symbol: self.get_stock_info(symbol, series[symbol]), symbols)
+            return dict(zip(symbols, results))
+
 
 class StockAnalysisCrew:
     """Simple crew of agents for stock analysis"""
 
     def __init__(self):
         self.data_fetcher = StockDataFetcher()
+        self.llm_cache = LLMCache()
         self.agents = self.create_agents()
+        # Load the model in the background; it overlaps with the symbol prompt
+        # and the stock data fetch instead of delaying them
+        threading.Thread(target=self.warm_up, daemon=True).start()
 
     def create_agents(self) -> Dict[str, OllamaAgent]:
         """Create the analysis agents"""
@@ -105,123 +446,204 @@ class StockAnalysisCrew:
             "market_analyst": OllamaAgent(
                 role="Senior Market Research Analyst",
                 goal="Analyze market conditions, industry trends, and competitive landscape",
-                backstory="You are an experienced market analyst with 15+ years in equity research. You excel at identifying market trends, competitive dynamics, and growth catalysts."
+                backstory="You are an experienced market analyst with 15+ years in equity research. You excel at identifying market trends, competitive dynamics, and growth catalysts.",
+                cache=self.llm_cache,
+                max_tokens=800
             ),
 
             "financial_analyst": OllamaAgent(
                 role="Senior Financial Analyst",
                 goal="Evaluate financial health, ratios, and valuation metrics",
-                backstory="You are a CFA charterholder with deep expertise in financial analysis. You can quickly assess company fundamentals, calculate key ratios, and identify financial strengths and weaknesses."
+                backstory="You are a CFA charterholder with deep expertise in financial analysis. You can quickly assess company fundamentals, calculate key ratios, and identify financial strengths and weaknesses.",
+                cache=self.llm_cache,
+                max_tokens=800
             ),
 
             "risk_analyst": OllamaAgent(
                 role="Risk Assessment Specialist",
                 goal="Identify and quantify investment risks and scenarios",
-                backstory="You are a risk management expert with expertise in portfolio theory and risk assessment. You excel at identifying potential risks and developing mitigation strategies."
+                backstory="You are a risk management expert with expertise in portfolio theory and risk assessment. You excel at identifying potential risks and developing mitigation strategies.",
+                cache=self.llm_cache,
+                max_tokens=800
             ),
 
             "investment_advisor": OllamaAgent(
                 role="Senior Investment Advisor",
                 goal="Synthesize analysis and provide actionable investment recommendations",
-                backstory="You are a seasoned investment advisor with 20+ years of experience. You excel at combining multiple analyses into clear, actionable investment recommendations."
+                backstory="You are a seasoned investment advisor with 20+ years of experience. You excel at combining multiple analyses into clear, actionable investment recommendations.",
+                cache=self.llm_cache,
+                max_tokens=600
             )
         }
 
-    def analyze_stock(self, symbol: str) -> Dict[str, Any]:
-        """Run complete stock analysis"""
-        print(f"\n🚀 Starting Analysis for {symbol.upper()}")
-        print("=" * 50)
+    def warm_up(self):
+        """Load the model into Ollama now so the first analyst call isn't cold"""
+        # A chat request without messages just loads the model
+        payload = {
+            "model": OLLAMA_MODEL,
+            "messages": [],
+            "keep_alive": OLLAMA_KEEP_ALIVE,
+            "options": OLLAMA_OPTIONS
+        }
 
-        # Step 1: Fetch stock data
-        print("📊 Fetching stock data...")
-        stock_data = self.data_fetcher.get_stock_info(symbol)
+        try:
+            _SESSION.post(OLLAMA_URL, json=payload, timeout=120)
+        except Exception:
+            # Not fatal, the model is loaded by the first real request instead
+            pass
+
+    def prime_context(self, context: str):
+        """Send the shared stock data message once so Ollama caches its KV prefix"""
+        payload = {
+            "model": OLLAMA_MODEL,
+            "messages": [{"role": "system", "content": context_prompt(context)}],
+            "stream": False,
+            "keep_alive": OLLAMA_KEEP_ALIVE,
+            "options": {**OLLAMA_OPTIONS, "num_predict": 1}
+        }
 
-        if "error" in stock_data:
-            return {"error": stock_data["error"]}
+        try:
+            _SESSION.post(OLLAMA_URL, json=payload, timeout=120)
+        except Exception:
+            # Not fatal, the agents just encode the prefix themselves
+            pass
+
+    async def with_client(self, coro):
+        """Await coro with one pooled Ollama client shared by every agent"""
+        async with create_async_client() as client:
+            for agent in self.agents.values():
+                agent.client = client
+            try:
+                return await coro
+            finally:
+                for agent in self.agents.values():
+                    agent.client = None
+
+    @staticmethod
+    async def limited(semaphore: asyncio.Semaphore, coro):
+        """Await an Ollama call while holding one of the run's request slots"""
+        async with semaphore:
+            return await coro
+
+    async def run_analysts(self, symbol: str, market_prompt: str, financial_prompt: str,
+                           risk_prompt: str, context: str,
+                           semaphore: asyncio.Semaphore) -> Dict[str, str]:
+        """Run the three analysts concurrently, then the investment advisor
+
+        The advisor continues the conversation made of each analyst's task and
+        full response, so it sees complete analyses and Ollama can reuse the
+        already-encoded messages instead of a re-pasted summary.
+        """
+        analysts = {
+            "market_analysis": ("market_analyst", market_prompt),
+            "financial_analysis": ("financial_analyst", financial_prompt),
+            "risk_analysis": ("risk_analyst", risk_prompt),
+        }
 
-        # Create context from stock data
-        context = f"""
-Stock: {stock_data['symbol']} - {stock_data['company_name']}
-Current Price: ${stock_data['current_price']}
-Market Cap: ${stock_data['market_cap']:,}
-P/E Ratio: {stock_data['pe_ratio']}
-Sector: {stock_data['sector']}
-Industry: {stock_data['industry']}
-Beta: {stock_data['beta']}
-Dividend Yield: {stock_data['dividend_yield']}
-52-Week Range: ${stock_data['52_week_low']} - ${stock_data['52_week_high']}
-Year Performance: {stock_data['year_performance']}
-"""
+        outputs = await asyncio.gather(*(
+            self.limited(semaphore, self.agents[agent_name].athink(prompt, context))
+            for agent_name, prompt in analysts.values()))
+        results = dict(zip(analysts, outputs))
 
-        results = {}
+        history = []
+        for key, (agent_name, prompt) in analysts.items():
+            history.append({"role": "user",
+                            "content": self.agents[agent_name].agent_prompt(prompt)})
+            history.append({"role": "assistant", "content": results[key]})
 
-        # Step 2: Market Analysis
-        print("🔍 Market Analyst working...")
-        market_prompt = f"""
-Analyze the market conditions for {symbol}:
+        logger.info("🎯 Investment Advisor synthesizing...")
+        results["investment_recommendation"] = await self.limited(
+            semaphore, self.agents["investment_advisor"].athink(
+                RECOMMENDATION_TEMPLATE.substitute(symbol=symbol), context, history))
+        return results
 
-1. Industry Analysis: What trends are affecting the {stock_data['sector']} sector?
-2. Competitive Position: How does this company compare in the {stock_data['industry']} industry?
-3. Market Catalysts: What factors could drive the stock price?
-4. Economic Impact: How might macroeconomic factors affect this stock?
+    def analyze_stock(self, symbol: str) -> Dict[str, Any]:
+        """Run complete stock analysis"""
+        return asyncio.run(self.with_client(self.analyze_stock_async(symbol)))
 
-Provide specific insights about market dynamics and competitive positioning.
-"""
-        results["market_analysis"] = self.agents["market_analyst"].think(
-            market_prompt, context)
+    def analyze_stocks(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Analyze several stocks concurrently, capped at OLLAMA_NUM_PARALLEL requests"""
+        return asyncio.run(self.with_client(self.analyze_stocks_async(symbols)))
 
-        # Step 3: Financial Analysis
-        print("💰 Financial Analyst working...")
-        financial_prompt = f"""
-Analyze the financial aspects of {symbol}:
+    async def analyze_stocks_async(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Async version of analyze_stocks"""
+        # One limit for the whole run, shared by every symbol's requests
+        semaphore = asyncio.Semaphore(OLLAMA_NUM_PARALLEL)
 
-1. Valuation Assessment: Is the P/E ratio of {stock_data['pe_ratio']} reasonable for this company?
-2. Financial Health: What does the current market cap of ${stock_data['market_cap']:,} suggest?
-3. Dividend Analysis: Evaluate the dividend yield of {stock_data['dividend_yield']}
-4. Growth Potential: Based on the sector and industry, what growth prospects exist?
+        logger.info("📊 Fetching stock data...")
+        stock_data = await asyncio.to_thread(
+            self.data_fetcher.get_stock_info_batch, symbols)
 
-Focus on financial metrics and valuation analysis.
-"""
-        results["financial_analysis"] = self.agents["financial_analyst"].think(
-            financial_prompt, context)
+        reports = await asyncio.gather(*(
+            self.analyze_stock_async(symbol, stock_data[symbol], semaphore)
+            for symbol in symbols))
+        return dict(zip(symbols, reports))
 
-        # Step 4: Risk Analysis
-        print("⚠️ Risk Analyst working...")
-        risk_prompt = f"""
-Assess the investment risks for {symbol}:
+    async def analyze_stock_async(self, symbol: str,
+                                  stock_data: Optional[Dict[str, Any]] = None,
+                                  semaphore: Optional[asyncio.Semaphore] = None) -> Dict[str, Any]:
+        """Async version of analyze_stock
 
-1. Market Risk: The beta is {stock_data['beta']} - what does this mean for volatility?
-2. Sector Risk: What risks are specific to the {stock_data['sector']} sector?
-3. Valuation Risk: Is the current valuation sustainable?
-4. Scenario Analysis: What are the best and worst case scenarios?
+        stock_data may be prefetched; semaphore caps concurrent Ollama requests
+        and is shared when several symbols are analyzed in one run.
+        """
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(OLLAMA_NUM_PARALLEL)
 
-Provide a comprehensive risk assessment with specific risk factors.
-"""
-        results["risk_analysis"] = self.agents["risk_analyst"].think(
-            risk_prompt, context)
+        logger.info(f"\n🚀 Starting Analysis for {symbol.upper()}")
+        logger.info("=" * 50)
+
+        # Step 1: Fetch stock data
+        if stock_data is None:
+            logger.info("📊 Fetching stock data...")
+            stock_data = await asyncio.to_thread(
+                self.data_fetcher.get_stock_info, symbol)
+
+        if "error" in stock_data:
+            return {"error": stock_data["error"]}
 
-        # Step 5: Investment Recommendation
-        print("🎯 Investment Advisor synthesizing...")
-        recommendation_prompt = f"""
-Based on all the analysis, provide a final investment recommendation for {symbol}:
+        # Flatten once so the templates read attributes, not dict keys
+        stock = StockInfo.from_data(stock_data)
+        market_cap = f"{stock.market_cap:,}"
 
-Market Analysis Summary: {results['market_analysis'][:500]}...
-Financial Analysis Summary: {results['financial_analysis'][:500]}...
-Risk Analysis Summary: {results['risk_analysis'][:500]}...
+        # Create context from stock data
+        context = CONTEXT_TEMPLATE.substitute(
+            stock._asdict(), market_cap=market_cap)
+
+        # Encode the stock data prefix once so every agent reuses its KV cache
+        await self.limited(
+            semaphore, asyncio.to_thread(self.prime_context, context))
+
+        # Steps 2-4: Market, Financial and Risk analysts run concurrently
+        # (they only depend on the stock data, not on each other)
+        market_prompt = MARKET_TEMPLATE.substitute(
+            symbol=symbol,
+            sector=stock.sector,
+            industry=stock.industry
+        )
 
-Provide:
-1. Investment Recommendation: BUY/HOLD/SELL with conviction level (1-10)
-2. Price Target: 12-month target price with reasoning
-3. Key Risks: Top 3 risks to monitor
-4. Investment Thesis: Why invest or not invest
-5. Position Sizing: Recommended allocation percentage
+        financial_prompt = FINANCIAL_TEMPLATE.substitute(
+            symbol=symbol,
+            pe_ratio=stock.pe_ratio,
+            market_cap=market_cap,
+            dividend_yield=stock.dividend_yield
+        )
 
-Make it actionable and specific.
-"""
-        results["investment_recommendation"] = self.agents["investment_advisor"].think(
-            recommendation_prompt, context
+        risk_prompt = RISK_TEMPLATE.substitute(
+            symbol=symbol,
+            beta=stock.beta,
+            sector=stock.sector
         )
 
+        logger.info("🔍 Market Analyst working...")
+        logger.info("💰 Financial Analyst working...")
+        logger.info("⚠️ Risk Analyst working...")
+
+        # Step 5: Investment Recommendation (runs after the analysts in run_analysts)
+        results = await self.run_analysts(
+            symbol, market_prompt, financial_prompt, risk_prompt, context,
+            semaphore)
+
         # Compile final report
         report = {
             "symbol": symbol.upper(),
@@ -240,8 +662,17 @@ Make it actionable and specific.
         if not filename:
             filename = f"stock_analysis_{report['symbol']}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
 
-        with open(filename, 'w') as f:
-            json.dump(report, f, indent=2)
+        # Write to a temp file and swap it in so an interrupted save
+        # never leaves a half-written report behind
+        tmp_filename = filename + ".tmp"
+        if orjson is not None:
+            with open(tmp_filename, 'wb') as f:
+                f.write(orjson.dumps(
+                    report, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        else:
+            with open(tmp_filename, 'w') as f:
+                json.dump(report, f, indent=2)
+        os.replace(tmp_filename, filename)
 
         print(f"📄 Report saved to: {filename}")
         return filename
@@ -249,6 +680,9 @@ Make it actionable and specific.
 
 def main():
     """Main function"""
+    # Progress messages from the crew go through logging
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
     print("🔍 Simple Stock Analysis Crew")
     print("=" * 40)
     print("Multi-agent stock analysis using Ollama!")
@@ -256,7 +690,7 @@ def main():
 
     # Check if Ollama is available
     try:
-        response = requests.get("http://localhost:11434/api/tags", timeout=5)
+        response = _SESSION.get("http://localhost:11434/api/tags", timeout=5)
         if response.status_code != 200:
             print("❌ Ollama not running. Please start Ollama first:")
             print("   ollama serve")
@@ -268,45 +702,56 @@ def main():
 
     print("✅ Connected to Ollama")
 
-    # Get stock symbol
-    symbol = input(
-        "\nEnter stock symbol (e.g., AAPL, TSLA, MSFT): ").strip().upper()
+    # Created before the prompt so the model loads while the user types
+    crew = StockAnalysisCrew()
+
+    # Get stock symbol(s)
+    raw = input(
+        "\nEnter stock symbol(s), comma-separated (e.g., AAPL, TSLA, MSFT): ")
+    symbols = [s.strip().upper() for s in raw.split(",") if s.strip()]
 
-    if not symbol:
+    if not symbols:
         print("❌ Please provide a valid stock symbol")
         return
 
     # Run analysis
-    crew = StockAnalysisCrew()
-
     try:
-        report = crew.analyze_stock(symbol)
+        if len(symbols) == 1:
+            reports = {symbols[0]: crew.analyze_stock(symbols[0])}
+        else:
+            reports = crew.analyze_stocks(symbols)
 
-        if "error" in report:
-            print(f"❌ Error: {report['error']}")
-            return
+        for symbol, report in reports.items():
+            print_summary(crew, symbol, report)
+
+    except Exception as e:
+        print(f"❌ Error during analysis: {str(e)}")
 
-        print(f"\n✅ Analysis Complete for {symbol}")
-        print("=" * 50)
 
-        # Save report
-        filename = crew.save_report(report)
+def print_summary(crew: StockAnalysisCrew, symbol: str, report: Dict[str, Any]):
+    """Save a report and print its investment summary"""
+    if "error" in report:
+        print(f"❌ Error for {symbol}: {report['error']}")
+        return
 
-        # Display summary
-        print(f"\n📊 INVESTMENT SUMMARY for {symbol}")
-        print("=" * 50)
-        print(f"Company: {report['stock_data']['company_name']}")
-        print(f"Current Price: ${report['stock_data']['current_price']}")
-        print(f"Sector: {report['stock_data']['sector']}")
-        print(f"Year Performance: {report['stock_data']['year_performance']}")
-        print()
-        print("🎯 INVESTMENT RECOMMENDATION:")
-        print(report['investment_recommendation'])
+    print(f"\n✅ Analysis Complete for {symbol}")
+    print("=" * 50)
 
-        print(f"\n📄 Full report saved to: {filename}")
+    # Save report
+    filename = crew.save_report(report)
 
-    except Exception as e:
-        print(f"❌ Error during analysis: {str(e)}")
+    # Display summary
+    print(f"\n📊 INVESTMENT SUMMARY for {symbol}")
+    print("=" * 50)
+    print(f"Company: {report['stock_data']['company_name']}")
+    print(f"Current Price: ${report['stock_data']['current_price']}")
+    print(f"Sector: {report['stock_data']['sector']}")
+    print(f"Year Performance: {report['stock_data']['year_performance']}")
+    print()
+    print("🎯 INVESTMENT RECOMMENDATION:")
+    print(report['investment_recommendation'])
+
+    print(f"\n📄 Full report saved to: {filename}")
 
 
 if __name__ == "__main__":
@@ -15,18 +15,61 @@ Uses Ollama with DeepSeek-R1 for advanced financial reasoning.
 
 import os
 import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, List
 
 from crewai import Agent, Task, Crew, Process
-from langchain_community.llms import Ollama
+from langchain_core.callbacks.streaming_stdout import StreamingStdOutCallbackHandler
 
-# Initialize Ollama with DeepSeek-R1 model
-llm = Ollama(
-    model="deepseek-r1:8b",
-    base_url="http://localhost:11434",
-    temperature=0.1  # Low temperature for more consistent financial analysis
-)
+from llm_cache import LLMCache
+from ollama_llm import OllamaLLM
+
+logger = logging.getLogger(__name__)
+
+# Agent/crew output is off by default: pretty-printing every prompt and
+# completion costs time on long runs. Set CREW_VERBOSE=1 or 2 to see it.
+VERBOSE = int(os.environ.get("CREW_VERBOSE", "0"))
+
+# Initialize Ollama with DeepSeek-R1 model. The research tasks run in their own
+# threads, so Ollama can serve their requests in parallel (start the server
+# with OLLAMA_NUM_PARALLEL=4 OLLAMA_MAX_LOADED_MODELS=1).
+OLLAMA_MODEL = os.environ.get("OLLAMA_MODEL", "deepseek-r1:8b")
+# The research analysts can use a lower-bit quantization (e.g. a q4_0 tag) for
+# faster generation; the risk and recommendation steps keep OLLAMA_MODEL
+OLLAMA_FAST_MODEL = os.environ.get("OLLAMA_FAST_MODEL", OLLAMA_MODEL)
+
+
+def create_llm(model: str, stream_to_stdout: bool = False) -> OllamaLLM:
+    """Create an Ollama LLM for the crew"""
+    return OllamaLLM(
+        model=model,
+        base_url="http://localhost:11434",
+        temperature=0.1,  # Low temperature for more consistent financial analysis
+        # The prompts are short; a fixed context keeps KV-cache memory small
+        num_ctx=4096,
+        # Print tokens as they are generated instead of waiting for each response
+        streaming=stream_to_stdout,
+        callbacks=[StreamingStdOutCallbackHandler()] if stream_to_stdout else [],
+        # Re-running a symbol reuses the answers to identical prompts
+        response_cache=LLMCache()
+    )
+
+
+# The research tasks run concurrently and their streamed tokens would
+# interleave, so they only stream with CREW_VERBOSE set
+llm = create_llm(OLLAMA_MODEL, stream_to_stdout=bool(VERBOSE))
+fast_llm = llm if OLLAMA_FAST_MODEL == OLLAMA_MODEL else create_llm(
+    OLLAMA_FAST_MODEL, stream_to_stdout=bool(VERBOSE))
+# The final recommendation always streams, so the answer appears as it is written
+advisor_llm = create_llm(OLLAMA_MODEL, stream_to_stdout=True)
+
+
+def report_filename(stock_symbol: str = "") -> str:
+    """Timestamped file name for the final report"""
+    symbol = f"{stock_symbol}_" if stock_symbol else ""
+    return f"stock_analysis_report_{symbol}{datetime.now().strftime('%Y%m%d_%H%M%S')}.md"
 
 
 class StockAnalysisCrew:
@@ -34,83 +77,73 @@ class StockAnalysisCrew:
 
     def __init__(self):
         self.llm = llm
+        self.fast_llm = fast_llm
+        self.advisor_llm = advisor_llm
+        # Agents, tasks and the crew are built once and reused for every
+        # symbol; {stock_symbol} is filled in by kickoff(inputs=...)
+        self.crew = self.create_crew()
 
     def create_market_research_analyst(self) -> Agent:
         """Creates a Market Research Analyst agent"""
         return Agent(
             role="Senior Market Research Analyst",
-            goal="Gather comprehensive market data, news, and industry trends for {stock_symbol}",
-            backstory="""You are a seasoned market research analyst with 15+ years of experience 
-            in equity research. You excel at gathering and synthesizing market data, news sentiment, 
-            industry trends, and competitive landscape analysis. You have access to multiple data 
-            sources and can quickly identify key market drivers and catalysts.""",
-            verbose=True,
+            goal="Gather market data, news, and industry trends for the stock in your task",
+            backstory="You are an equity research analyst who identifies market drivers and catalysts.",
+            verbose=bool(VERBOSE),
             allow_delegation=False,
-            llm=self.llm,
+            llm=self.fast_llm,
             max_iter=3,
-            memory=True
+            memory=False
         )
 
     def create_financial_analyst(self) -> Agent:
         """Creates a Financial Analyst agent"""
         return Agent(
             role="Senior Financial Analyst",
-            goal="Analyze financial statements, calculate key ratios, and assess financial health of {stock_symbol}",
-            backstory="""You are a CFA charterholder with extensive experience in financial statement 
-            analysis. You specialize in calculating and interpreting financial ratios, identifying 
-            trends in revenue, profitability, and cash flow. You can quickly spot red flags and 
-            strengths in a company's financial position.""",
-            verbose=True,
+            goal="Analyze financial statements, key ratios, and financial health of the stock in your task",
+            backstory="You are a CFA charterholder who spots strengths and red flags in financial statements.",
+            verbose=bool(VERBOSE),
             allow_delegation=False,
-            llm=self.llm,
+            llm=self.fast_llm,
             max_iter=3,
-            memory=True
+            memory=False
         )
 
     def create_technical_analyst(self) -> Agent:
         """Creates a Technical Analyst agent"""
         return Agent(
             role="Senior Technical Analyst",
-            goal="Perform technical analysis including chart patterns, indicators, and price action for {stock_symbol}",
-            backstory="""You are a technical analysis expert with deep knowledge of chart patterns, 
-            technical indicators, and market psychology. You can identify support/resistance levels, 
-            trend patterns, and momentum indicators. You provide insights on optimal entry/exit points 
-            and short-term price movements.""",
-            verbose=True,
+            goal="Analyze chart patterns, indicators, and price action of the stock in your task",
+            backstory="You are a technical analyst who reads trends, support/resistance, and momentum.",
+            verbose=bool(VERBOSE),
             allow_delegation=False,
-            llm=self.llm,
+            llm=self.fast_llm,
             max_iter=3,
-            memory=True
+            memory=False
         )
 
     def create_risk_analyst(self) -> Agent:
         """Creates a Risk Assessment Specialist agent"""
         return Agent(
             role="Risk Assessment Specialist",
-            goal="Evaluate investment risks, volatility, and potential downside scenarios for {stock_symbol}",
-            backstory="""You are a risk management expert with expertise in quantitative risk models, 
-            scenario analysis, and portfolio theory. You excel at identifying and quantifying various 
-            types of investment risks including market risk, sector risk, company-specific risk, and 
-            macroeconomic risks.""",
-            verbose=True,
+            goal="Evaluate investment risks, volatility, and downside scenarios for the stock in your task",
+            backstory="You are a risk manager who quantifies market, sector, company, and macro risks.",
+            verbose=bool(VERBOSE),
             allow_delegation=False,
             llm=self.llm,
             max_iter=3,
-            memory=True
+            memory=False
         )
 
     def create_investment_advisor(self) -> Agent:
         """Creates an Investment Advisor agent"""
         return Agent(
             role="Senior Investment Advisor",
-            goal="Synthesize all analysis and provide actionable investment recommendations for {stock_symbol}",
-            backstory="""You are a senior investment advisor with 20+ years of experience managing 
-            portfolios for high-net-worth clients. You excel at synthesizing complex financial analysis 
-            into clear, actionable investment recommendations. You consider risk tolerance, investment 
-            horizon, and market conditions in your recommendations.""",
-            verbose=True,
+            goal="Synthesize all analysis into an actionable recommendation for the stock in your task",
+            backstory="You are a senior investment advisor who turns analysis into clear recommendations.",
+            verbose=bool(VERBOSE),
             allow_delegation=True,
-            llm=self.llm,
+            llm=self.advisor_llm,
             max_iter=3,
             memory=True
         )
@@ -118,16 +151,15 @@ class StockAnalysisCrew:
     def create_market_research_task(self, agent: Agent) -> Task:
         """Creates market research task"""
         return Task(
-            description="""Conduct comprehensive market research for {stock_symbol}:
-            
-            1. **Company Overview**: Basic company information, business model, key products/services
-            2. **Industry Analysis**: Industry trends, growth prospects, competitive landscape
-            3. **Recent News & Events**: Recent earnings, announcements, news sentiment
-            4. **Market Position**: Market share, competitive advantages, key competitors
-            5. **Macroeconomic Factors**: Relevant economic indicators affecting the stock
-            
-            Focus on gathering factual, current information that will inform investment decisions.
-            Identify key catalysts and risk factors from a market perspective.""",
+            description="""Conduct market research covering:
+            1. Company overview and business model
+            2. Industry trends and competitive landscape
+            3. Recent news, earnings, and sentiment
+            4. Market position and key competitors
+            5. Relevant macroeconomic factors
+            Focus on facts, catalysts, and market risks.
+
+            Stock: {stock_symbol}""",
 
             expected_output="""A comprehensive market research report containing:
             - Company overview and business model analysis
@@ -136,22 +168,24 @@ class StockAnalysisCrew:
             - Market catalysts and risk factors
             - Macroeconomic impact assessment""",
 
-            agent=agent
+            agent=agent,
+            # Independent of the other tasks, runs alongside them
+            async_execution=True
         )
 
     def create_financial_analysis_task(self, agent: Agent) -> Task:
         """Creates financial analysis task"""
         return Task(
-            description="""Perform detailed financial analysis for {stock_symbol}:
-            
-            1. **Financial Statements Review**: Latest income statement, balance sheet, cash flow
-            2. **Key Financial Ratios**: Profitability, liquidity, efficiency, leverage ratios
-            3. **Trend Analysis**: 3-5 year historical trends in key metrics
-            4. **Valuation Metrics**: P/E, P/B, P/S, EV/EBITDA, PEG ratio analysis
-            5. **Financial Health**: Debt levels, cash position, working capital analysis
-            6. **Growth Analysis**: Revenue growth, earnings growth, margin trends
-            
-            Provide quantitative analysis with specific numbers and calculations.""",
+            description="""Perform financial analysis covering:
+            1. Income statement, balance sheet, and cash flow
+            2. Profitability, liquidity, efficiency, and leverage ratios
+            3. 3-5 year trends in key metrics
+            4. Valuation: P/E, P/B, P/S, EV/EBITDA, PEG
+            5. Debt, cash position, and working capital
+            6. Revenue, earnings, and margin growth
+            Use specific numbers.
+
+            Stock: {stock_symbol}""",
 
             expected_output="""A detailed financial analysis report including:
             - Key financial ratios with industry comparisons
@@ -160,22 +194,24 @@ class StockAnalysisCrew:
             - Financial strength and weakness identification
             - Growth trajectory analysis""",
 
-            agent=agent
+            agent=agent,
+            # Independent of the other tasks, runs alongside them
+            async_execution=True
         )
 
     def create_technical_analysis_task(self, agent: Agent) -> Task:
         """Creates technical analysis task"""
         return Task(
-            description="""Perform comprehensive technical analysis for {stock_symbol}:
-            
-            1. **Price Action Analysis**: Current trend, support/resistance levels
-            2. **Chart Patterns**: Identify key chart patterns and formations
-            3. **Technical Indicators**: RSI, MACD, Moving averages, Volume analysis
-            4. **Momentum Analysis**: Price momentum, trend strength indicators
-            5. **Entry/Exit Points**: Optimal buying/selling levels based on technicals
-            6. **Short-term Outlook**: Technical forecast for next 1-3 months
-            
-            Focus on actionable technical insights for trading and investment timing.""",
+            description="""Perform technical analysis covering:
+            1. Current trend and support/resistance levels
+            2. Key chart patterns
+            3. RSI, MACD, moving averages, and volume
+            4. Momentum and trend strength
+            5. Entry/exit levels
+            6. 1-3 month outlook
+            Focus on actionable timing insights.
+
+            Stock: {stock_symbol}""",
 
             expected_output="""A comprehensive technical analysis report containing:
             - Current trend analysis and key levels
@@ -185,23 +221,25 @@ class StockAnalysisCrew:
             - Recommended entry/exit strategies
             - Short-term price targets and stop-loss levels""",
 
-            agent=agent
+            agent=agent,
+            # Independent of the other tasks, runs alongside them
+            async_execution=True
         )
 
-    def create_risk_assessment_task(self, agent: Agent) -> Task:
+    def create_risk_assessment_task(self, agent: Agent, context: List[Task]) -> Task:
         """Creates risk assessment task"""
         return Task(
-            description="""Conduct thorough risk assessment for {stock_symbol}:
-            
-            1. **Market Risk**: Beta analysis, correlation with market indices
-            2. **Sector Risk**: Industry-specific risks and cyclical factors
-            3. **Company Risk**: Business model risks, management risks, operational risks
-            4. **Financial Risk**: Leverage, liquidity, credit risks
-            5. **Regulatory Risk**: Compliance, regulatory changes, legal issues
-            6. **Scenario Analysis**: Best case, worst case, and base case scenarios
-            7. **Risk-Reward Assessment**: Risk-adjusted return potential
-            
-            Quantify risks where possible and provide mitigation strategies.""",
+            description="""Assess risks covering:
+            1. Market risk: beta and index correlation
+            2. Sector and cyclical risk
+            3. Business, management, and operational risk
+            4. Leverage, liquidity, and credit risk
+            5. Regulatory and legal risk
+            6. Best, base, and worst case scenarios
+            7. Risk-adjusted return potential
+            Quantify where possible and suggest mitigations.
+
+            Stock: {stock_symbol}""",
 
             expected_output="""A comprehensive risk assessment report including:
             - Quantified risk metrics (Beta, volatility, VaR if applicable)
@@ -211,25 +249,24 @@ class StockAnalysisCrew:
             - Overall risk rating and justification""",
 
             agent=agent,
-            context=["market_research_task",
-                     "financial_analysis_task", "technical_analysis_task"]
+            # Waits for the research tasks and receives their output
+            context=context
         )
 
-    def create_investment_recommendation_task(self, agent: Agent) -> Task:
+    def create_investment_recommendation_task(self, agent: Agent, context: List[Task]) -> Task:
         """Creates final investment recommendation task"""
         return Task(
-            description="""Synthesize all analysis and provide final investment recommendation for {stock_symbol}:
-            
-            1. **Executive Summary**: Key findings from all analyses
-            2. **Investment Thesis**: Bull and bear case scenarios
-            3. **Valuation Assessment**: Fair value estimate and current valuation
-            4. **Risk-Reward Analysis**: Expected returns vs. identified risks
-            5. **Investment Recommendation**: BUY/HOLD/SELL with conviction level
-            6. **Price Targets**: 12-month price target with ranges
-            7. **Portfolio Allocation**: Recommended position size considerations
-            8. **Monitoring Points**: Key metrics and events to watch
-            
-            Provide clear, actionable recommendations with supporting rationale.""",
+            description="""Synthesize all analysis into a final recommendation covering:
+            1. Executive summary
+            2. Bull and bear case
+            3. Fair value vs. current valuation
+            4. Expected return vs. risks
+            5. BUY/HOLD/SELL with conviction level
+            6. 12-month price target range
+            7. Position sizing
+            8. Metrics and events to monitor
+
+            Stock: {stock_symbol}""",
 
             expected_output="""A comprehensive investment recommendation report containing:
             - Clear BUY/HOLD/SELL recommendation with conviction level
@@ -240,12 +277,11 @@ class StockAnalysisCrew:
             - Executive summary suitable for decision-making""",
 
             agent=agent,
-            context=["market_research_task", "financial_analysis_task",
-                     "technical_analysis_task", "risk_assessment_task"],
-            output_file=f"stock_analysis_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md"
+            context=context,
+            output_file=report_filename()
         )
 
-    def create_crew(self, stock_symbol: str) -> Crew:
+    def create_crew(self) -> Crew:
         """Creates and returns the stock analysis crew"""
 
         # Create agents
@@ -261,9 +297,12 @@ class StockAnalysisCrew:
             financial_analyst)
         technical_analysis_task = self.create_technical_analysis_task(
             technical_analyst)
-        risk_assessment_task = self.create_risk_assessment_task(risk_analyst)
+        research_tasks = [market_research_task,
+                          financial_analysis_task, technical_analysis_task]
+        risk_assessment_task = self.create_risk_assessment_task(
+            risk_analyst, context=research_tasks)
         investment_recommendation_task = self.create_investment_recommendation_task(
-            investment_advisor)
+            investment_advisor, context=research_tasks + [risk_assessment_task])
 
         # Create and return crew
         return Crew(
@@ -281,38 +320,70 @@ class StockAnalysisCrew:
                 risk_assessment_task,
                 investment_recommendation_task
             ],
+            # Market, financial and technical tasks run concurrently; the risk
+            # task waits for all three before it starts
             process=Process.sequential,
-            verbose=2,
-            memory=True
+            verbose=VERBOSE,
+            # Tasks pass their results through context=[...]; crew memory
+            # would only add an embedding and vector-store write per task
+            memory=False
         )
 
     def analyze_stock(self, stock_symbol: str) -> str:
         """Run the complete stock analysis for a given symbol"""
-        print(f"\n🚀 Starting Stock Analysis for {stock_symbol.upper()}")
-        print("=" * 60)
+        logger.info(f"\n🚀 Starting Stock Analysis for {stock_symbol.upper()}")
+        logger.info("=" * 60)
 
-        # Create crew
-        crew = self.create_crew(stock_symbol)
+        # Each run writes its own report
+        self.crew.tasks[-1].output_file = report_filename()
 
         # Run analysis
-        result = crew.kickoff(inputs={"stock_symbol": stock_symbol.upper()})
+        result = self.crew.kickoff(inputs={"stock_symbol": stock_symbol.upper()})
 
-        print(f"\n✅ Analysis Complete for {stock_symbol.upper()}")
-        print("=" * 60)
+        logger.info(f"\n✅ Analysis Complete for {stock_symbol.upper()}")
+        logger.info("=" * 60)
 
         return result
 
+    def analyze_portfolio(self, symbols: List[str]) -> Dict[str, str]:
+        """Run the complete stock analysis for several symbols concurrently"""
+        symbols = [symbol.upper() for symbol in symbols]
+        logger.info(f"\n🚀 Starting Stock Analysis for {', '.join(symbols)}")
+        logger.info("=" * 60)
+
+        # Each symbol gets its own crew and the crews run together, so Ollama
+        # can batch their requests (see OLLAMA_NUM_PARALLEL). Crew.copy() and
+        # kickoff_for_each_async are not used: in crewai 0.51 copied tasks lose
+        # their context links and the async variant runs every crew twice.
+        def run(symbol: str):
+            crew = self.create_crew()
+            crew.tasks[-1].output_file = report_filename(symbol)
+            return crew.kickoff(inputs={"stock_symbol": symbol})
+
+        with ThreadPoolExecutor(max_workers=max(len(symbols), 1)) as executor:
+            results = list(executor.map(run, symbols))
+
+        logger.info(f"\n✅ Analysis Complete for {', '.join(symbols)}")
+        logger.info("=" * 60)
+
+        return dict(zip(symbols, results))
+
 
 def main():
     """Main function to run stock analysis"""
+    # Progress messages are only shown alongside the verbose crew output
+    logging.basicConfig(level=logging.INFO if VERBOSE else logging.WARNING,
+                        format="%(message)s")
+
     print("🔍 Stock Analysis AI Crew")
     print("=" * 40)
 
-    # Get stock symbol from user
-    stock_symbol = input(
-        "Enter stock symbol to analyze (e.g., AAPL, TSLA, MSFT): ").strip().upper()
+    # Get stock symbol(s) from user
+    raw = input(
+        "Enter stock symbol(s) to analyze, comma-separated (e.g., AAPL, TSLA, MSFT): ")
+    symbols = [s.strip().upper() for s in raw.split(",") if s.strip()]
 
-    if not stock_symbol:
+    if not symbols:
         print("❌ Please provide a valid stock symbol")
         return
 
@@ -320,8 +391,13 @@ def main():
     crew = StockAnalysisCrew()
 
     try:
-        result = crew.analyze_stock(stock_symbol)
-        print(f"\n📊 Final Analysis Result:\n{result}")
+        if len(symbols) == 1:
+            results = {symbols[0]: crew.analyze_stock(symbols[0])}
+        else:
+            results = crew.analyze_portfolio(symbols)
+
+        for symbol, result in results.items():
+            print(f"\n📊 Final Analysis Result for {symbol}:\n{result}")
 
     except Exception as e:
         print(f"❌ Error during analysis: {str(e)}")
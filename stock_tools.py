@@ -7,13 +7,105 @@ Custom tools for the Stock Analysis AI Crew to enhance analysis capabilities.
 These tools provide data fetching, financial calculations, and analysis utilities.
 """
 
+import re
 import json
+import time
+import hashlib
+import inspect
+import functools
 import requests
-from typing import Dict, List, Any, Optional
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, NamedTuple, Union
+from datetime import datetime, timedelta, timezone
+from statistics import NormalDist
+import diskcache
+import numpy as np
 import yfinance as yf
 import pandas as pd
 
+try:
+    from numba import njit
+except ImportError:  # optional, the indicators then run as plain NumPy
+    def njit(*args, **kwargs):
+        return lambda function: function
+
+STOCK_CACHE_DIR = "./.stock_cache"
+INTRADAY_TTL = 3600  # prices: stock info and price history
+FUNDAMENTALS_TTL = 86400  # financial statements
+
+# Sentiment keywords and their common inflections, matched as whole words so
+# "declined" and "profits" count but "badge" and "goodwill" do not
+POSITIVE_PATTERN = re.compile(
+    r"\b(?:good|great|excellent|strong(?:er|est)?|positive|growth"
+    r"|profit(?:s|able)?|success(?:ful)?)\b")
+NEGATIVE_PATTERN = re.compile(
+    r"\b(?:bad|poor|weak(?:er|ness)?|negative|declin(?:e|es|ed|ing)"
+    r"|loss(?:es)?|risks?|concerns?)\b")
+
+
+def stock_cache_key(symbol: str, method: str, *args) -> str:
+    """Cache key for a data fetch, scoped to the current UTC date"""
+    today = datetime.now(timezone.utc).date()
+    raw = "|".join([symbol.upper(), method, *map(str, args), str(today)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def cached_fetch(ttl: int):
+    """Cache a StockDataTool fetch in memory and on disk for ttl seconds
+
+    Error results are not cached.
+    """
+    def decorator(method):
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            # Bind with defaults filled in so f("AAPL"), f("AAPL", "1y") and
+            # f("AAPL", period="1y") share one key
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            self, symbol, *rest = bound.arguments.values()
+
+            key = stock_cache_key(symbol, method.__name__, *rest)
+            result = self.cached(key)
+            if result is None:
+                result = method(*bound.args, **bound.kwargs)
+                if "error" not in result:
+                    self.store(key, result, ttl)
+            return result
+        return wrapper
+    return decorator
+
+
+@njit(cache=True)
+def technical_kernel(prices):
+    """SMA 20/50, 10-day momentum, 20-day volatility, support and resistance
+
+    Statistics that need more data than is available are NaN.
+    """
+    n = prices.size
+    sma_20 = sma_50 = momentum_10 = volatility_20d = np.nan
+    support = resistance = np.nan
+
+    if n >= 10:
+        momentum_10 = (prices[-1] / prices[-10] - 1.0) * 100.0
+    if n >= 50:
+        sma_50 = prices[-50:].mean()
+    if n >= 20:
+        recent = prices[-20:]
+        sma_20 = recent.mean()
+        support = recent.min()
+        resistance = recent.max()
+
+        # Population standard deviation of the 19 daily returns within the same
+        # last 20 prices as the SMA, support and resistance
+        returns = np.empty(19)
+        for i in range(19):
+            returns[i] = prices[n - 19 + i] / prices[n - 20 + i] - 1.0
+        volatility_20d = returns.std() * 100.0
+
+    return sma_20, sma_50, momentum_10, volatility_20d, support, resistance
+
 
 class StockDataTool:
     """Tool for fetching stock data and financial information"""
@@ -21,69 +113,196 @@ class StockDataTool:
     def __init__(self):
         self.name = "Stock Data Fetcher"
         self.description = "Fetches real-time and historical stock data, financial statements, and company information"
+        # key -> (expiry timestamp, result), in front of the persistent disk cache
+        self.memory_cache: Dict[str, tuple] = {}
+        self.disk_cache = diskcache.Cache(STOCK_CACHE_DIR)
+        # One Ticker per symbol so its session and fetched data are reused
+        self.tickers: Dict[str, yf.Ticker] = {}
+
+    def cached(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a cached result from memory or disk, or None on a miss"""
+        entry = self.memory_cache.get(key)
+        if entry is not None:
+            if entry[0] > time.time():
+                return entry[1]
+            self.memory_cache.pop(key, None)
+
+        # The memory entry expires together with the disk entry, so a result
+        # never outlives the ttl it was stored with
+        result, expire_time = self.disk_cache.get(key, expire_time=True)
+        if result is not None:
+            self.memory_cache[key] = (expire_time, result)
+        return result
+
+    def store(self, key: str, result: Dict[str, Any], ttl: int):
+        """Cache a result in memory and on disk"""
+        self.disk_cache.set(key, result, expire=ttl)
+        self.memory_cache[key] = (time.time() + ttl, result)
+
+    def ticker(self, symbol: str) -> yf.Ticker:
+        """Return the shared Ticker for a symbol"""
+        if symbol not in self.tickers:
+            self.tickers[symbol] = yf.Ticker(symbol)
+        return self.tickers[symbol]
+
+    def get_all(self, symbol: str, period: str = "1y") -> Dict[str, Any]:
+        """Get stock info, historical data and financial statements at once"""
+        # The fetches are independent and mostly wait on the network
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            info_future = executor.submit(self.get_stock_info, symbol)
+            hist_future = executor.submit(
+                self.get_historical_data, symbol, period)
+            financials_future = executor.submit(
+                self.get_financial_statements, symbol)
+            return {
+                "stock_info": info_future.result(),
+                "historical": hist_future.result(),
+                "financials": financials_future.result()
+            }
 
+    @cached_fetch(ttl=INTRADAY_TTL)
     def get_stock_info(self, symbol: str) -> Dict[str, Any]:
         """Get basic stock information"""
         try:
-            stock = yf.Ticker(symbol)
-            info = stock.info
+            # A single get_info() request covers every field below. A fresh
+            # Ticker is used because Ticker memoizes info for its lifetime,
+            # which would keep serving stale prices once the cache expires.
+            info = yf.Ticker(symbol).get_info()
+            get = info.get
 
             return {
                 "symbol": symbol,
-                "company_name": info.get("longName", "N/A"),
-                "sector": info.get("sector", "N/A"),
-                "industry": info.get("industry", "N/A"),
-                "market_cap": info.get("marketCap", 0),
-                "current_price": info.get("currentPrice", 0),
-                "previous_close": info.get("previousClose", 0),
-                "day_high": info.get("dayHigh", 0),
-                "day_low": info.get("dayLow", 0),
-                "volume": info.get("volume", 0),
-                "pe_ratio": info.get("trailingPE", 0),
-                "forward_pe": info.get("forwardPE", 0),
-                "dividend_yield": info.get("dividendYield", 0),
-                "beta": info.get("beta", 0),
-                "52_week_high": info.get("fiftyTwoWeekHigh", 0),
-                "52_week_low": info.get("fiftyTwoWeekLow", 0),
+                "company_name": get("longName", "N/A"),
+                "sector": get("sector", "N/A"),
+                "industry": get("industry", "N/A"),
+                "market_cap": get("marketCap", 0),
+                "current_price": get("currentPrice", 0),
+                "previous_close": get("previousClose", 0),
+                "day_high": get("dayHigh", 0),
+                "day_low": get("dayLow", 0),
+                "volume": get("volume", 0),
+                "pe_ratio": get("trailingPE", 0),
+                "forward_pe": get("forwardPE", 0),
+                "dividend_yield": get("dividendYield", 0),
+                "beta": get("beta", 0),
+                "52_week_high": get("fiftyTwoWeekHigh", 0),
+                "52_week_low": get("fiftyTwoWeekLow", 0),
             }
         except Exception as e:
             return {"error": f"Failed to fetch stock info: {str(e)}"}
 
+    @cached_fetch(ttl=INTRADAY_TTL)
     def get_historical_data(self, symbol: str, period: str = "1y") -> Dict[str, Any]:
         """Get historical price data"""
         try:
-            stock = yf.Ticker(symbol)
-            hist = stock.history(period=period)
+            hist = self.ticker(symbol).history(period=period)
+            return self.summarize_history(symbol, period, hist)
+        except Exception as e:
+            return {"error": f"Failed to fetch historical data: {str(e)}"}
+
+    def get_closes(self, symbol: str, period: str = "1y") -> np.ndarray:
+        """Closing prices, ready for calculate_technical_indicators
+
+        Empty if the history can't be fetched.
+        """
+        result = self.get_close_history(symbol, period)
+        if "error" in result:
+            return np.empty(0)
+        return result["closes"]
 
+    @cached_fetch(ttl=INTRADAY_TTL)
+    def get_close_history(self, symbol: str, period: str = "1y") -> Dict[str, Any]:
+        """Get closing prices as a NumPy array (also cached by get_historical_data)"""
+        try:
+            hist = self.ticker(symbol).history(period=period)
             if hist.empty:
                 return {"error": "No historical data available"}
+            return {"closes": hist["Close"].to_numpy(dtype=np.float64)}
+        except Exception as e:
+            return {"error": f"Failed to fetch historical data: {str(e)}"}
+
+    def get_historical_data_batch(self, symbols: List[str], period: str = "1y") -> Dict[str, Dict[str, Any]]:
+        """Get historical price data for several symbols in one download"""
+        results = {}
+        keys = {symbol: stock_cache_key(symbol, "get_historical_data", period)
+                for symbol in symbols}
+        missing = []
+        for symbol in symbols:
+            cached = self.cached(keys[symbol])
+            if cached is not None:
+                results[symbol] = cached
+            else:
+                missing.append(symbol)
+
+        data = None
+        if missing:
+            try:
+                data = yf.download(" ".join(missing), period=period, group_by="ticker",
+                                   threads=True, progress=False)
+            except Exception:
+                pass
+
+        for symbol in missing:
+            if data is None or symbol not in data.columns.get_level_values(0):
+                # Fall back to fetching the history on its own
+                results[symbol] = self.get_historical_data(symbol, period)
+                continue
+
+            result = self.summarize_history(
+                symbol, period, data[symbol].dropna(how="all"))
+            if "error" not in result:
+                self.store(keys[symbol], result, INTRADAY_TTL)
+            results[symbol] = result
+        return results
+
+    def summarize_history(self, symbol: str, period: str, hist: pd.DataFrame) -> Dict[str, Any]:
+        """Summary statistics of a price history"""
+        try:
+            if hist.empty:
+                return {"error": "No historical data available"}
+
+            # Pull each column out once and work on the raw arrays
+            close = hist["Close"].to_numpy(dtype=np.float64)
+            # Keep the full series for get_closes without putting it in the summary
+            self.store(stock_cache_key(symbol, "get_close_history", period),
+                       {"closes": close}, INTRADAY_TTL)
+            # Annualized volatility of daily log returns
+            log_returns = np.log(close[1:] / close[:-1])
+            volatility = np.nanstd(log_returns, ddof=1) * np.sqrt(252.0)
+            # About ten evenly spaced closes give the shape of the period
+            # without putting the whole series into the prompt
+            step = max(len(close) // 10, 1)
 
             return {
                 "symbol": symbol,
                 "period": period,
                 "data_points": len(hist),
-                "latest_close": float(hist['Close'].iloc[-1]),
-                "period_high": float(hist['High'].max()),
-                "period_low": float(hist['Low'].min()),
-                "average_volume": float(hist['Volume'].mean()),
-                "price_change": float(hist['Close'].iloc[-1] - hist['Close'].iloc[0]),
-                "price_change_percent": float((hist['Close'].iloc[-1] - hist['Close'].iloc[0]) / hist['Close'].iloc[0] * 100),
-                # Annualized volatility
-                "volatility": float(hist['Close'].pct_change().std() * (252**0.5)),
-                "raw_data": hist.to_dict()
+                "latest_close": float(close[-1]),
+                "period_high": float(np.nanmax(hist["High"].to_numpy(dtype=np.float64))),
+                "period_low": float(np.nanmin(hist["Low"].to_numpy(dtype=np.float64))),
+                "average_volume": float(np.nanmean(hist["Volume"].to_numpy(dtype=np.float64))),
+                "price_change": float(close[-1] - close[0]),
+                "price_change_percent": float((close[-1] - close[0]) / close[0] * 100),
+                "volatility": float(volatility),
+                "price_samples": [round(float(price), 2) for price in close[::step]]
             }
         except Exception as e:
-            return {"error": f"Failed to fetch historical data: {str(e)}"}
+            return {"error": f"Failed to summarize historical data: {str(e)}"}
 
+    @cached_fetch(ttl=FUNDAMENTALS_TTL)
     def get_financial_statements(self, symbol: str) -> Dict[str, Any]:
         """Get financial statements data"""
         try:
-            stock = yf.Ticker(symbol)
+            stock = self.ticker(symbol)
 
-            # Get financial statements
-            income_stmt = stock.financials
-            balance_sheet = stock.balance_sheet
-            cash_flow = stock.cashflow
+            # Get financial statements (each one is a separate request)
+            with ThreadPoolExecutor(max_workers=3) as executor:
+                income_future = executor.submit(lambda: stock.financials)
+                balance_future = executor.submit(lambda: stock.balance_sheet)
+                cash_flow_future = executor.submit(lambda: stock.cashflow)
+                income_stmt = income_future.result()
+                balance_sheet = balance_future.result()
+                cash_flow = cash_flow_future.result()
 
             result = {
                 "symbol": symbol,
@@ -118,6 +337,37 @@ class StockDataTool:
             return {"error": f"Failed to fetch financial statements: {str(e)}"}
 
 
+class FinancialSnapshot(NamedTuple):
+    """Figures used by the ratio calculations (field names match the
+    calculate_financial_ratios_batch columns, so a list of snapshots can be
+    turned into its input with pd.DataFrame(snapshots))"""
+    total_revenue: float = 0
+    net_income: float = 0
+    gross_profit: float = 0
+    total_assets: float = 0
+    total_debt: float = 0
+    stockholder_equity: float = 0
+    market_cap: float = 0
+    current_price: float = 0
+
+    @classmethod
+    def from_data(cls, financial_data: Dict[str, Any]) -> "FinancialSnapshot":
+        """Build from financial statements and stock info dicts"""
+        income = financial_data.get("income_statement", {})
+        balance = financial_data.get("balance_sheet", {})
+        stock_info = financial_data.get("stock_info", {})
+        return cls(
+            total_revenue=income.get("total_revenue", 0),
+            net_income=income.get("net_income", 0),
+            gross_profit=income.get("gross_profit", 0),
+            total_assets=balance.get("total_assets", 0),
+            total_debt=balance.get("total_debt", 0),
+            stockholder_equity=balance.get("stockholder_equity", 0),
+            market_cap=stock_info.get("market_cap", 0),
+            current_price=stock_info.get("current_price", 0)
+        )
+
+
 class FinancialCalculatorTool:
     """Tool for financial calculations and ratio analysis"""
 
@@ -125,24 +375,16 @@ class FinancialCalculatorTool:
         self.name = "Financial Calculator"
         self.description = "Performs financial calculations, ratio analysis, and valuation metrics"
 
-    def calculate_financial_ratios(self, financial_data: Dict[str, Any]) -> Dict[str, float]:
+    def calculate_financial_ratios(self, financial_data: Union[FinancialSnapshot, Dict[str, Any]]) -> Dict[str, float]:
         """Calculate key financial ratios"""
         ratios = {}
 
         try:
             # Extract data
-            income = financial_data.get("income_statement", {})
-            balance = financial_data.get("balance_sheet", {})
-            stock_info = financial_data.get("stock_info", {})
-
-            revenue = income.get("total_revenue", 0)
-            net_income = income.get("net_income", 0)
-            gross_profit = income.get("gross_profit", 0)
-            total_assets = balance.get("total_assets", 0)
-            total_debt = balance.get("total_debt", 0)
-            equity = balance.get("stockholder_equity", 0)
-            market_cap = stock_info.get("market_cap", 0)
-            current_price = stock_info.get("current_price", 0)
+            if not isinstance(financial_data, FinancialSnapshot):
+                financial_data = FinancialSnapshot.from_data(financial_data)
+            (revenue, net_income, gross_profit, total_assets, total_debt,
+             equity, market_cap, current_price) = financial_data
 
             # Profitability Ratios
             if revenue > 0:
@@ -178,38 +420,64 @@ class FinancialCalculatorTool:
 
         return ratios
 
+    def calculate_financial_ratios_batch(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """Calculate key financial ratios for many companies at once
+
+        frame has one row per company and the columns total_revenue,
+        net_income, gross_profit, total_assets, total_debt,
+        stockholder_equity and market_cap. Ratios that
+        calculate_financial_ratios would leave out are NaN.
+        """
+        # Non-positive denominators become NaN, which propagates to the ratio
+        revenue = frame["total_revenue"].where(frame["total_revenue"] > 0)
+        total_assets = frame["total_assets"].where(frame["total_assets"] > 0)
+        equity = frame["stockholder_equity"].where(
+            frame["stockholder_equity"] > 0)
+        earnings = frame["net_income"].where(frame["net_income"] > 0)
+        market_cap = frame["market_cap"].where(frame["market_cap"] > 0)
+
+        return pd.DataFrame({
+            # Profitability Ratios
+            "gross_margin": frame["gross_profit"] / revenue * 100,
+            "net_margin": frame["net_income"] / revenue * 100,
+            "roa": frame["net_income"] / total_assets * 100,
+            "roe": frame["net_income"] / equity * 100,
+            # Leverage Ratios
+            "debt_to_assets": frame["total_debt"] / total_assets * 100,
+            "debt_to_equity": frame["total_debt"] / equity * 100,
+            # Valuation Ratios
+            "pe_ratio": market_cap / earnings,
+            "price_to_sales": market_cap / revenue,
+            "price_to_book": market_cap / equity,
+        }, index=frame.index)
+
     def calculate_technical_indicators(self, price_data: List[float], volume_data: List[float] = None) -> Dict[str, Any]:
         """Calculate basic technical indicators"""
-        if not price_data or len(price_data) < 2:
+        if price_data is None or len(price_data) < 2:
             return {"error": "Insufficient price data"}
 
         try:
+            prices = np.ascontiguousarray(price_data, dtype=np.float64)
+            sma_20, sma_50, momentum_10, volatility_20d, support, resistance = \
+                technical_kernel(prices)
+
             indicators = {}
 
             # Simple Moving Averages
-            if len(price_data) >= 20:
-                indicators["sma_20"] = sum(price_data[-20:]) / 20
-            if len(price_data) >= 50:
-                indicators["sma_50"] = sum(price_data[-50:]) / 50
+            if prices.size >= 20:
+                indicators["sma_20"] = float(sma_20)
+            if prices.size >= 50:
+                indicators["sma_50"] = float(sma_50)
 
             # Price momentum
-            if len(price_data) >= 10:
-                indicators["momentum_10"] = (
-                    (price_data[-1] / price_data[-10]) - 1) * 100
-
-            # Volatility (standard deviation of returns)
-            if len(price_data) >= 20:
-                returns = [(price_data[i] / price_data[i-1] - 1)
-                           for i in range(1, len(price_data))]
-                volatility = (
-                    sum([(r - sum(returns)/len(returns))**2 for r in returns]) / len(returns))**0.5
-                indicators["volatility_20d"] = volatility * 100
-
-            # Support and Resistance (simple version)
-            if len(price_data) >= 20:
-                recent_prices = price_data[-20:]
-                indicators["support_level"] = min(recent_prices)
-                indicators["resistance_level"] = max(recent_prices)
+            if prices.size >= 10:
+                indicators["momentum_10"] = float(momentum_10)
+
+            # Volatility, support and resistance (simple version)
+            if prices.size >= 20:
+                indicators["volatility_20d"] = float(volatility_20d)
+                indicators["support_level"] = float(support)
+                indicators["resistance_level"] = float(resistance)
 
             return indicators
 
@@ -248,16 +516,9 @@ class NewsAnalysisTool:
     def analyze_sentiment(self, text: str) -> Dict[str, Any]:
         """Analyze sentiment of text (basic implementation)"""
         # Simple keyword-based sentiment analysis
-        positive_words = ["good", "great", "excellent",
-                          "strong", "positive", "growth", "profit", "success"]
-        negative_words = ["bad", "poor", "weak", "negative",
-                          "decline", "loss", "risk", "concern"]
-
         text_lower = text.lower()
-        positive_count = sum(
-            1 for word in positive_words if word in text_lower)
-        negative_count = sum(
-            1 for word in negative_words if word in text_lower)
+        positive_count = len(POSITIVE_PATTERN.findall(text_lower))
+        negative_count = len(NEGATIVE_PATTERN.findall(text_lower))
 
         total_words = len(text.split())
 
@@ -289,22 +550,36 @@ class RiskCalculatorTool:
         self.name = "Risk Calculator"
         self.description = "Calculates various risk metrics and assessments"
 
-    def calculate_var(self, returns: List[float], confidence_level: float = 0.95) -> Dict[str, float]:
-        """Calculate Value at Risk (VaR)"""
-        if not returns or len(returns) < 10:
+    def calculate_var(self, returns: List[float], confidence_level: float = 0.95,
+                      method: str = "parametric") -> Dict[str, float]:
+        """Calculate Value at Risk (VaR)
+
+        method="parametric" assumes normally distributed returns and uses
+        their mean and standard deviation; method="historical" takes the
+        empirical quantile of the returns.
+        """
+        if returns is None or len(returns) < 10:
             return {"error": "Insufficient return data for VaR calculation"}
+        if method not in ("parametric", "historical"):
+            return {"error": f"Unknown VaR method: {method}"}
 
         try:
-            returns_sorted = sorted(returns)
-            var_index = int((1 - confidence_level) * len(returns_sorted))
-            var_value = returns_sorted[var_index]
+            arr = np.asarray(returns, dtype=np.float64)
+            if method == "parametric":
+                z = NormalDist().inv_cdf(1 - confidence_level)
+                var_value = arr.mean() + arr.std(ddof=1) * z
+            else:
+                # Quantile selection is O(n), no full sort needed
+                var_value = np.quantile(
+                    arr, 1 - confidence_level, method="lower")
 
             return {
-                "var_95": var_value,
+                "var_95": float(var_value),
+                "method": method,
                 "confidence_level": confidence_level,
-                "worst_case_scenario": min(returns_sorted),
-                "best_case_scenario": max(returns_sorted),
-                "average_return": sum(returns) / len(returns)
+                "worst_case_scenario": float(arr.min()),
+                "best_case_scenario": float(arr.max()),
+                "average_return": float(arr.mean())
             }
         except Exception as e:
             return {"error": f"VaR calculation error: {str(e)}"}